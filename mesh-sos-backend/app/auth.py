@@ -0,0 +1,18 @@
+"""
+API key authentication for mesh nodes and dashboards
+"""
+from fastapi import Header, HTTPException, status
+
+from .config import get_settings
+
+settings = get_settings()
+
+
+async def verify_api_key(x_api_key: str = Header(...)) -> str:
+    """Validate the X-API-Key header against the configured API key."""
+    if x_api_key != settings.api_key:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid API key"
+        )
+    return x_api_key
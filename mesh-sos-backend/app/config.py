@@ -0,0 +1,39 @@
+"""
+Application configuration loaded from environment variables / .env
+"""
+import os
+from functools import lru_cache
+
+from dotenv import dotenv_values
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+# Parse .env once at import instead of letting pydantic-settings stat and
+# re-read it per Settings() construction (one per uvicorn worker). Real
+# environment variables still win over .env values.
+_ENV = {
+    key.lower(): value
+    for key, value in dotenv_values(".env").items()
+    if value is not None and key not in os.environ
+}
+
+
+class Settings(BaseSettings):
+    """Application settings"""
+    database_url: str = "sqlite:///./meshsos.db"
+    api_key: str = "meshsos-dev-api-key-change-in-production"
+    debug: bool = False
+
+    # Connection pool tuning (Postgres only); tunable without redeploy
+    pool_size: int = 20
+    max_overflow: int = 10
+    pool_recycle: int = 1800  # seconds; avoids stale-connection 500s
+    pool_timeout: int = 30  # seconds
+    statement_timeout_ms: int = 60000
+
+    model_config = SettingsConfigDict(env_file=None)
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Return the cached application settings"""
+    return Settings(**_ENV)
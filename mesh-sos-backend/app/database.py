@@ -1,34 +1,63 @@
 """
 Database configuration and session management
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-
-# SQLite database for simplicity
-DATABASE_URL = "sqlite:///./meshsos.db"
-
-# Create SQLAlchemy engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Required for SQLite
-)
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+
+from .config import get_settings
+
+settings = get_settings()
+
+
+def _async_url(url: str):
+    """Map a plain database URL onto its async driver."""
+    parsed = make_url(url)
+    if parsed.drivername == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    elif parsed.drivername in ("postgresql", "postgresql+psycopg2"):
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    return parsed
+
+
+DATABASE_URL = _async_url(settings.database_url)
+
+# Create SQLAlchemy async engine - DB calls no longer block the event loop.
+# SQLite (dev/tests) uses the dialect's own pooling; the QueuePool knobs
+# only apply to Postgres. pre_ping + recycle keep dropped connections from
+# surfacing as 500s, and the server-side statement timeout stops a runaway
+# query from pinning a pooled connection.
+_engine_kwargs = {}
+if DATABASE_URL.get_backend_name() == "postgresql":
+    _engine_kwargs.update(
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_pre_ping=True,
+        pool_recycle=settings.pool_recycle,
+        pool_timeout=settings.pool_timeout,
+        connect_args={
+            "server_settings": {
+                "statement_timeout": str(settings.statement_timeout_ms)
+            }
+        },
+    )
+
+engine = create_async_engine(DATABASE_URL, **_engine_kwargs)
 
 # Session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 
 # Base class for models
 Base = declarative_base()
 
 
-def get_db():
+async def get_db():
     """Dependency to get database session"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    async with SessionLocal() as session:
+        yield session
 
 
-def init_db():
+async def init_db():
     """Initialize database tables"""
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
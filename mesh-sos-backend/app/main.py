@@ -1,29 +1,38 @@
 """
 MeshSOS Backend - FastAPI Application
 """
+import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
+from .config import get_settings
 from .database import init_db
 from .routes import sos
 
+logger = logging.getLogger("uvicorn.error")
+settings = get_settings()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler"""
-    print("🚀 Starting MeshSOS Backend...")
-    init_db()
-    print("✅ Database initialized")
+    logger.info("Starting MeshSOS Backend...")
+    await init_db()
+    logger.info("Database initialized")
     yield
-    print("👋 Shutting down...")
+    logger.info("Shutting down...")
 
 
 app = FastAPI(
     title="MeshSOS Backend",
     description="Backend API for Offline Emergency Mesh SOS Network",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS - Allow all origins for development
@@ -39,6 +48,19 @@ app.add_middleware(
 app.include_router(sos.router)
 
 
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    """Standard 422 response; the offending body is only read and logged
+    in debug so production never pays for it on a validation-error storm."""
+    errors = jsonable_encoder(exc.errors())
+    if settings.debug:
+        body = await request.body()
+        logger.debug(
+            "Validation error on %s: %s body=%r", request.url.path, errors, body
+        )
+    return ORJSONResponse(status_code=422, content={"detail": errors})
+
+
 @app.get("/")
 async def root():
     """Health check"""
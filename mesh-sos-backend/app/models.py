@@ -6,22 +6,44 @@ from enum import Enum
 from typing import Optional
 from uuid import UUID
 
-from pydantic import BaseModel, Field, field_validator
-from sqlalchemy import Column, String, Float, Integer, DateTime, Enum as SQLEnum, Text, Boolean
-from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from sqlalchemy import Column, String, Float, Integer, DateTime, Enum as SQLEnum, Text, Boolean, Index, Uuid
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import expression
 
 from .database import Base
 
 
+class utcnow(expression.FunctionElement):
+    """Server-side UTC timestamp for the naive-UTC DateTime columns.
+
+    Plain now() on Postgres is converted through the session TimeZone
+    before landing in a naive column, which would shift the active-SOS
+    window on non-UTC servers; SQLite's CURRENT_TIMESTAMP is already UTC.
+    """
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow, "postgresql")
+def _pg_utcnow(element, compiler, **kw):
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+
+@compiles(utcnow)
+def _default_utcnow(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
 # ============ Enums ============
 
 class EmergencyType(str, Enum):
-    """Type of emergency"""
-    MEDICAL = "MEDICAL"
-    FIRE = "FIRE"
-    FLOOD = "FLOOD"
-    EARTHQUAKE = "EARTHQUAKE"
-    GENERAL = "GENERAL"
+    """Type of emergency (lowercase on the wire, matching the mobile app)"""
+    MEDICAL = "medical"
+    FIRE = "fire"
+    FLOOD = "flood"
+    EARTHQUAKE = "earthquake"
+    GENERAL = "general"
 
 
 class DeliveryStatus(str, Enum):
@@ -38,8 +60,9 @@ class SosPacketDB(Base):
     """SQLAlchemy model for SOS packets in database"""
     __tablename__ = "sos_packets"
     
-    # Primary key - using String for SQLite compatibility
-    sos_id = Column(String(36), primary_key=True)
+    # Primary key - native UUID on Postgres (16 bytes on the wire),
+    # CHAR fallback on SQLite
+    sos_id = Column(Uuid, primary_key=True)
     
     # Device info (hashed for privacy)
     device_id = Column(String(64), nullable=False, index=True)
@@ -53,7 +76,11 @@ class SosPacketDB(Base):
     accuracy = Column(Float, nullable=True)
     
     # Emergency details
-    emergency_type = Column(SQLEnum(EmergencyType), nullable=False, default=EmergencyType.GENERAL)
+    emergency_type = Column(
+        SQLEnum(EmergencyType, native_enum=True, validate_strings=False),
+        nullable=False,
+        default=EmergencyType.GENERAL
+    )
     optional_message = Column(Text, nullable=True)
     
     # Battery info
@@ -68,18 +95,30 @@ class SosPacketDB(Base):
     
     # Server-side tracking
     status = Column(SQLEnum(DeliveryStatus), nullable=False, default=DeliveryStatus.DELIVERED)
-    received_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Stamped by the DB on insert: monotonic server-side time, one less
+    # bound parameter per write
+    received_at = Column(DateTime, nullable=False, server_default=utcnow())
     responded_at = Column(DateTime, nullable=True)
     responder_id = Column(String(64), nullable=True)
     
     # Relay tracking
     uploaded_by_device_id = Column(String(64), nullable=True)
 
+    __table_args__ = (
+        # Matches the filter + sort of the active-SOS query so it runs as
+        # an index range scan instead of a full scan + sort
+        Index("ix_sos_active", "status", "received_at", "timestamp"),
+        # For the optional emergency_type filter branch
+        Index("ix_sos_emergency_type", "emergency_type"),
+    )
+
 
 # ============ Pydantic Schemas ============
 
 class SosPacketCreate(BaseModel):
     """Schema for creating/uploading SOS packet"""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     sos_id: UUID
     device_id: str = Field(..., min_length=1, max_length=128)
     timestamp: datetime
@@ -98,12 +137,14 @@ class SosPacketCreate(BaseModel):
     def validate_emergency_type(cls, v):
         """Accept both uppercase and lowercase emergency types"""
         if isinstance(v, str):
-            return v.upper()
+            return v.lower()
         return v
 
 
 class SosPacketResponse(BaseModel):
     """Schema for SOS packet in responses"""
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
     sos_id: UUID
     device_id: str
     timestamp: datetime
@@ -118,12 +159,7 @@ class SosPacketResponse(BaseModel):
     status: DeliveryStatus
     received_at: datetime
     responded_at: Optional[datetime] = None
-    
-    model_config = {
-        "from_attributes": True,
-        "json_encoders": {},
-    }
-    
+
     def model_dump(self, **kwargs):
         """Override to exclude None values by default"""
         kwargs.setdefault('exclude_none', True)
@@ -143,7 +179,25 @@ class UploadResponse(BaseModel):
     message: str
 
 
+class BatchUploadResponse(BaseModel):
+    """Response for batch upload from a mesh gateway"""
+    inserted: list[UUID]
+    duplicates: list[UUID]
+    rejected: list[UUID]
+
+
 class ActiveSosResponse(BaseModel):
     """Response containing list of active SOS packets"""
     count: int
     sos_packets: list[SosPacketResponse]
+    # Compound keyset cursor: pass both back as ?before=&before_id= to
+    # fetch the next page. The sos_id tiebreaker keeps rows that share
+    # the boundary timestamp from being skipped.
+    next_cursor: Optional[datetime] = None
+    next_cursor_id: Optional[UUID] = None
+
+
+# Eager-build the hot-path schema cores at import so the first upload
+# doesn't pay the deferred core-schema construction
+SosPacketCreate.model_rebuild(force=True)
+SosPacketResponse.model_rebuild(force=True)
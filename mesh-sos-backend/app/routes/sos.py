@@ -1,69 +1,171 @@
 """
 SOS packet API routes - Simple, clean implementation
 """
-from datetime import datetime, timedelta
+import logging
+import time
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import and_, exists, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
+from ..auth import verify_api_key
+from ..config import get_settings
 from ..database import get_db
 from ..models import (
-    SosPacketDB, 
-    SosPacketCreate, 
-    SosPacketResponse, 
+    SosPacketDB,
+    SosPacketCreate,
+    SosPacketResponse,
     UploadResponse,
     ActiveSosResponse,
+    BatchUploadResponse,
     MarkRespondedRequest,
     DeliveryStatus,
-    EmergencyType
+    EmergencyType,
+    utcnow
 )
 
-router = APIRouter(prefix="/api/v1", tags=["SOS"])
+# Module-level so handlers don't pay a logging-manager lookup per request
+logger = logging.getLogger("meshsos.sos")
+
+settings = get_settings()
+
+router = APIRouter(
+    prefix="/api/v1",
+    tags=["SOS"],
+    dependencies=[Depends(verify_api_key)]
+)
+
+# Reject packets older than this (basic replay-attack protection)
+MAX_PACKET_AGE = timedelta(hours=1)
+
+# Upper bound on packets per batch upload
+MAX_BATCH_SIZE = 500
+
+# Every status except RESPONDED counts as active
+ACTIVE_STATUSES = [
+    DeliveryStatus.PENDING,
+    DeliveryStatus.RELAYED,
+    DeliveryStatus.DELIVERED,
+]
+
+
+# Only the columns SosPacketResponse exposes: excludes signature,
+# responder_id and uploaded_by_device_id, so those TEXT columns never
+# leave the DB on the list path
+_RESPONSE_COLUMNS = (
+    SosPacketDB.sos_id,
+    SosPacketDB.device_id,
+    SosPacketDB.timestamp,
+    SosPacketDB.latitude,
+    SosPacketDB.longitude,
+    SosPacketDB.accuracy,
+    SosPacketDB.emergency_type,
+    SosPacketDB.optional_message,
+    SosPacketDB.battery_percentage,
+    SosPacketDB.hop_count,
+    SosPacketDB.ttl,
+    SosPacketDB.status,
+    SosPacketDB.received_at,
+    SosPacketDB.responded_at,
+)
+
+# Parses a raw batch-upload body in one call, skipping FastAPI's
+# per-item recursion through the body field
+_batch_adapter = TypeAdapter(list[SosPacketCreate])
+
+# Short-TTL cache for /active-sos: responder dashboards poll the same
+# query, so serve a cached response per (hours, limit, emergency_type)
+# for a few seconds instead of re-running the filter + sort per poll.
+# Cursored pages are never cached - their keys vary per request and
+# would grow the dict without bound. Per-process: a write invalidates
+# this worker's entries immediately, while other gunicorn workers may
+# serve data up to ACTIVE_CACHE_TTL old.
+ACTIVE_CACHE_TTL = 10.0  # seconds
+# Hard cap per worker: the key space spans every (hours, limit,
+# emergency_type) combination, so without a bound a client sweeping
+# query params could pin one full response per combination
+ACTIVE_CACHE_MAX_ENTRIES = 128
+_active_cache: dict = {}
+
+
+def invalidate_active_cache():
+    """Drop cached /active-sos responses after any write."""
+    _active_cache.clear()
+
+
+def _cache_active_response(key, response):
+    """Store a response, evicting expired then oldest entries at the cap."""
+    now = time.monotonic()
+    if len(_active_cache) >= ACTIVE_CACHE_MAX_ENTRIES:
+        expired = [k for k, v in _active_cache.items() if v[0] <= now]
+        for k in expired:
+            del _active_cache[k]
+        # Dicts iterate in insertion order, so this drops oldest-first
+        while len(_active_cache) >= ACTIVE_CACHE_MAX_ENTRIES:
+            del _active_cache[next(iter(_active_cache))]
+    _active_cache[key] = (now + ACTIVE_CACHE_TTL, response)
+
+
+def _insert(db: AsyncSession):
+    """Return the dialect-specific insert() supporting ON CONFLICT."""
+    if db.get_bind().dialect.name == "postgresql":
+        return pg_insert
+    return sqlite_insert
+
+
+def _is_stale(timestamp: datetime) -> bool:
+    """True if a packet timestamp is older than MAX_PACKET_AGE."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return datetime.utcnow() - timestamp > MAX_PACKET_AGE
 
 
 @router.post("/upload-sos", response_model=UploadResponse)
 async def upload_sos(
     packet: SosPacketCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Upload an SOS packet from a mesh node."""
-    sos_id_str = str(packet.sos_id)
-    
-    # Check if packet already exists (deduplication)
-    existing = db.query(SosPacketDB).filter(SosPacketDB.sos_id == sos_id_str).first()
-    
-    if existing:
+    # Reject stale packets (replay-attack protection)
+    if _is_stale(packet.timestamp):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="SOS packet timestamp is too old"
+        )
+
+    # Insert with DB-side dedup: a single round-trip, atomic under
+    # concurrent uploads of the same packet from multiple relays
+    values = packet.model_dump()
+    values["status"] = DeliveryStatus.DELIVERED
+
+    stmt = _insert(db)(SosPacketDB).values(**values).on_conflict_do_nothing(
+        index_elements=["sos_id"]
+    )
+    result = await db.execute(stmt)
+    await db.commit()
+
+    if result.rowcount == 0:
         return UploadResponse(
             success=True,
             sos_id=packet.sos_id,
             message="SOS packet already exists"
         )
-    
-    # Create new packet record
-    db_packet = SosPacketDB(
-        sos_id=sos_id_str,
-        device_id=packet.device_id,
-        timestamp=packet.timestamp,
-        latitude=packet.latitude,
-        longitude=packet.longitude,
-        accuracy=packet.accuracy,
-        emergency_type=packet.emergency_type,
-        optional_message=packet.optional_message,
-        battery_percentage=packet.battery_percentage,
-        hop_count=packet.hop_count,
-        ttl=packet.ttl,
-        signature=packet.signature,
-        status=DeliveryStatus.DELIVERED,
-        received_at=datetime.utcnow()
-    )
-    
-    db.add(db_packet)
-    db.commit()
-    db.refresh(db_packet)
-    
+
+    invalidate_active_cache()
+    logger.info("Received SOS packet %s", packet.sos_id)
+    # Full payload dump only in debug; the isEnabledFor guard keeps the
+    # model_dump() off the hot path entirely when disabled
+    if settings.debug and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("SOS packet payload: %s", packet.model_dump())
+
     return UploadResponse(
         success=True,
         sos_id=packet.sos_id,
@@ -71,58 +173,202 @@ async def upload_sos(
     )
 
 
+@router.post("/upload-sos-batch", response_model=BatchUploadResponse)
+async def upload_sos_batch(
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """Upload a batch of queued SOS packets from a mesh gateway.
+
+    One bulk insert and one commit for the whole batch instead of one
+    transaction per packet. The body is parsed directly with the batch
+    TypeAdapter in a single validate_json call.
+    """
+    try:
+        packets = _batch_adapter.validate_json(await request.body())
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors())
+
+    if len(packets) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Batch exceeds {MAX_BATCH_SIZE} packets"
+        )
+
+    rejected = []
+    duplicates = []
+    rows = []
+    seen = set()
+
+    for packet in packets:
+        if _is_stale(packet.timestamp):
+            rejected.append(packet.sos_id)
+            continue
+        if packet.sos_id in seen:
+            duplicates.append(packet.sos_id)
+            continue
+        seen.add(packet.sos_id)
+        values = packet.model_dump()
+        values["status"] = DeliveryStatus.DELIVERED
+        rows.append(values)
+
+    inserted = []
+    if rows:
+        stmt = (
+            _insert(db)(SosPacketDB)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["sos_id"])
+            .returning(SosPacketDB.sos_id)
+        )
+        result = await db.execute(stmt)
+        await db.commit()
+
+        inserted_ids = set(result.scalars())
+        # Walk the accepted rows in request order so identical batches
+        # produce identical responses
+        accepted = [row["sos_id"] for row in rows]
+        inserted = [p for p in accepted if p in inserted_ids]
+        duplicates.extend(p for p in accepted if p not in inserted_ids)
+
+    if inserted:
+        invalidate_active_cache()
+        logger.info("Batch upload: %d new, %d duplicate, %d rejected",
+                    len(inserted), len(duplicates), len(rejected))
+
+    return BatchUploadResponse(
+        inserted=inserted,
+        duplicates=duplicates,
+        rejected=rejected
+    )
+
+
 @router.get("/active-sos", response_model=ActiveSosResponse)
 async def get_active_sos(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     hours: int = Query(24, ge=1, le=168),
-    limit: int = Query(100, ge=1, le=500)
+    limit: int = Query(100, ge=1, le=500),
+    emergency_type: Optional[EmergencyType] = Query(None),
+    before: Optional[datetime] = Query(None),
+    before_id: Optional[UUID] = Query(None)
 ):
-    """Get all active (non-responded) SOS packets."""
+    """Get all active (non-responded) SOS packets.
+
+    Pages via keyset cursor: pass the previous response's next_cursor
+    and next_cursor_id as ?before=&before_id= to fetch older packets
+    without OFFSET's linear skip cost.
+    """
+    cache_key = (hours, limit, emergency_type)
+    cached = _active_cache.get(cache_key) if before is None else None
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
     time_threshold = datetime.utcnow() - timedelta(hours=hours)
-    
-    packets = db.query(SosPacketDB).filter(
+
+    # Positive status list instead of != RESPONDED so the composite index
+    # can be used directly rather than a negation predicate
+    stmt = select(*_RESPONSE_COLUMNS).where(
         and_(
-            SosPacketDB.status != DeliveryStatus.RESPONDED,
+            SosPacketDB.status.in_(ACTIVE_STATUSES),
             SosPacketDB.received_at >= time_threshold
         )
-    ).order_by(SosPacketDB.timestamp.desc()).limit(limit).all()
-    
-    response_packets = [SosPacketResponse.model_validate(p) for p in packets]
-    
-    return ActiveSosResponse(
+    )
+
+    if emergency_type is not None:
+        stmt = stmt.where(SosPacketDB.emergency_type == emergency_type)
+
+    if before is not None:
+        if before_id is not None:
+            # Compound comparison so rows sharing the boundary row's
+            # timestamp aren't skipped between pages
+            stmt = stmt.where(
+                or_(
+                    SosPacketDB.timestamp < before,
+                    and_(
+                        SosPacketDB.timestamp == before,
+                        SosPacketDB.sos_id < before_id
+                    )
+                )
+            )
+        else:
+            stmt = stmt.where(SosPacketDB.timestamp < before)
+
+    stmt = stmt.order_by(
+        SosPacketDB.timestamp.desc(), SosPacketDB.sos_id.desc()
+    ).limit(limit)
+    try:
+        rows = (await db.execute(stmt)).all()
+    except SQLAlchemyError:
+        # Serve a stale cached response rather than failing the dashboard
+        if cached is not None:
+            logger.warning("active-sos query failed; serving stale cache")
+            return cached[1]
+        raise
+
+    # model_construct skips per-field re-validation of values the DB
+    # schema already enforces
+    response_packets = [
+        SosPacketResponse.model_construct(**row._mapping) for row in rows
+    ]
+
+    # A full page means there may be older packets past the last row
+    next_cursor = None
+    next_cursor_id = None
+    if len(response_packets) == limit:
+        next_cursor = response_packets[-1].timestamp
+        next_cursor_id = response_packets[-1].sos_id
+
+    response = ActiveSosResponse(
         count=len(response_packets),
-        sos_packets=response_packets
+        sos_packets=response_packets,
+        next_cursor=next_cursor,
+        next_cursor_id=next_cursor_id
     )
+    if before is None:
+        _cache_active_response(cache_key, response)
+    return response
 
 
 @router.post("/mark-responded", response_model=UploadResponse)
 async def mark_responded(
     request: MarkRespondedRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Mark an SOS packet as responded."""
-    sos_id_str = str(request.sos_id)
-    packet = db.query(SosPacketDB).filter(SosPacketDB.sos_id == sos_id_str).first()
-    
-    if not packet:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"SOS packet {request.sos_id} not found"
+    # Targeted UPDATE instead of hydrating the row just to flip a status;
+    # the hot path is a single statement
+    result = await db.execute(
+        update(SosPacketDB)
+        .where(
+            SosPacketDB.sos_id == request.sos_id,
+            SosPacketDB.status != DeliveryStatus.RESPONDED
+        )
+        .values(
+            status=DeliveryStatus.RESPONDED,
+            responded_at=utcnow(),
+            responder_id=request.responder_id
         )
-    
-    if packet.status == DeliveryStatus.RESPONDED:
+    )
+    await db.commit()
+
+    if result.rowcount == 0:
+        # One-bit existence probe to tell "unknown id" apart from
+        # "already responded" - no column projection, no ORM object
+        found = await db.scalar(
+            select(exists().where(SosPacketDB.sos_id == request.sos_id))
+        )
+        if not found:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"SOS packet {request.sos_id} not found"
+            )
         return UploadResponse(
             success=True,
             sos_id=request.sos_id,
             message="Already marked as responded"
         )
-    
-    packet.status = DeliveryStatus.RESPONDED
-    packet.responded_at = datetime.utcnow()
-    packet.responder_id = request.responder_id
-    
-    db.commit()
-    
+
+    invalidate_active_cache()
+
     return UploadResponse(
         success=True,
         sos_id=request.sos_id,
@@ -133,16 +379,20 @@ async def mark_responded(
 @router.get("/sos/{sos_id}", response_model=SosPacketResponse)
 async def get_sos_by_id(
     sos_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get a specific SOS packet by ID."""
-    sos_id_str = str(sos_id)
-    packet = db.query(SosPacketDB).filter(SosPacketDB.sos_id == sos_id_str).first()
-    
-    if not packet:
+    # Read-only path: project the response columns so no ORM object or
+    # identity-map entry is built for a row we only serialize
+    result = await db.execute(
+        select(*_RESPONSE_COLUMNS).where(SosPacketDB.sos_id == sos_id)
+    )
+    row = result.first()
+
+    if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"SOS packet {sos_id} not found"
         )
-    
-    return SosPacketResponse.model_validate(packet)
+
+    return SosPacketResponse.model_construct(**row._mapping)
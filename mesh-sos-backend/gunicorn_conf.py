@@ -0,0 +1,19 @@
+"""
+Gunicorn configuration for production deployment
+"""
+import os
+
+# One worker per core: Pydantic validation and JSON encoding are the
+# CPU-bound part of the request path and parallelize across workers
+workers = max(2, (os.cpu_count() or 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+worker_connections = 1000
+bind = "0.0.0.0:8000"
+
+# Import the app before forking so workers share the precompiled
+# Pydantic validators and route tables via copy-on-write
+preload_app = True
+
+# NOTE: each worker opens its own asyncpg pool; keep
+# Settings.pool_size + max_overflow times `workers` under the Postgres
+# max_connections limit (tune POOL_SIZE via the environment).
@@ -0,0 +1,202 @@
+"""
+Shared test fixtures: per-worker SQLite engine, transactional isolation,
+and the app test client
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+# Temp-file SQLite for testing: unlike :memory: + StaticPool, a file DB
+# gets a real connection pool, and WAL mode lets readers run alongside a
+# writer instead of serializing every request on one connection.
+# Under pytest-xdist every worker process gets its own DB file so the
+# suite parallelizes without write contention (run with `pytest -n auto`).
+_DB_DIR = tempfile.mkdtemp(prefix="meshsos-tests-")
+_WORKER = os.environ.get("PYTEST_XDIST_WORKER", "main")
+_DB_FILE = f"{_DB_DIR}/test_{_WORKER}.db"
+# Schema is materialized once into a template file; standing up a DB is
+# then a file copy instead of re-running the CREATE TABLE statements
+_TEMPLATE_DB = f"{_DB_DIR}/template.db"
+SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{_DB_FILE}"
+
+# Point the app's own engine at the test DB before any app module is
+# imported: the lifespan's init_db would otherwise run DDL against
+# whatever DATABASE_URL the environment or a local .env points at
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_FILE}"
+
+from app.auth import verify_api_key  # noqa: E402
+from app.main import app  # noqa: E402
+from app.database import Base, get_db  # noqa: E402
+from app.routes.sos import invalidate_active_cache  # noqa: E402
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "auth: run the real API-key check instead of the no_auth override"
+    )
+
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL)
+TestingSessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+# Throughput-oriented PRAGMAs: WAL avoids writer/reader blocking,
+# synchronous=NORMAL drops the fsync per commit (safe under WAL for a
+# throwaway test DB), and the rest keep hot pages and temp state in memory
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA busy_timeout=10000",
+)
+
+
+# The sqlite driver's implicit BEGIN breaks SAVEPOINTs under an external
+# transaction; take over transaction control so the rollback fixture works
+# (see the SQLAlchemy pysqlite/aiosqlite docs)
+@event.listens_for(engine.sync_engine, "connect")
+def _sqlite_on_connect(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    for pragma in _SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+@event.listens_for(engine.sync_engine, "begin")
+def _sqlite_emit_begin(conn):
+    conn.exec_driver_sql("BEGIN")
+
+
+async def _delete_all_rows():
+    """Empty every table in reverse dependency order.
+
+    The cheap reset for data that escapes the per-test rollback: plain
+    DELETEs in one transaction, no drop_all/create_all DDL.
+    """
+    async with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            await conn.execute(table.delete())
+
+
+async def _build_template_db():
+    template_engine = create_async_engine(f"sqlite+aiosqlite:///{_TEMPLATE_DB}")
+    async with template_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await template_engine.dispose()
+
+
+async def _begin_test_transaction():
+    connection = await engine.connect()
+    transaction = await connection.begin()
+    # Handler commits land on SAVEPOINTs inside the outer transaction,
+    # so the teardown rollback wipes everything the test wrote
+    session = TestingSessionLocal(
+        bind=connection, join_transaction_mode="create_savepoint"
+    )
+    return connection, transaction, session
+
+
+async def _end_test_transaction(connection, transaction, session):
+    await session.close()
+    await transaction.rollback()
+    await connection.close()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def setup_database():
+    """Stand up the worker DB by copying the schema template.
+
+    Tests needing a throwaway non-transactional DB can copy
+    _TEMPLATE_DB the same way instead of re-running DDL.
+    """
+    asyncio.run(_build_template_db())
+    shutil.copyfile(_TEMPLATE_DB, _DB_FILE)
+    yield
+    asyncio.run(engine.dispose())
+    shutil.rmtree(_DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Shared TestClient; entering the context runs the app lifespan once"""
+    with TestClient(app) as c:
+        yield c
+
+
+async def _session_per_request():
+    """get_db override for concurrent async tests.
+
+    Each request gets its own session and pooled connection, since one
+    AsyncSession cannot be shared by overlapping requests.
+    """
+    async with TestingSessionLocal() as session:
+        yield session
+
+
+@pytest_asyncio.fixture
+async def async_client():
+    """In-process async client for tests that gather concurrent requests.
+
+    Writes commit straight to the DB rather than into the per-test
+    transaction, so teardown wipes the tables instead of rolling back.
+    """
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = _session_per_request
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as ac:
+            yield ac
+    finally:
+        if previous is not None:
+            app.dependency_overrides[get_db] = previous
+        else:
+            app.dependency_overrides.pop(get_db, None)
+        await _delete_all_rows()
+
+
+@pytest.fixture(autouse=True)
+def no_auth(request):
+    """Bypass the API-key hash/compare for tests that don't assert auth.
+
+    Tests marked @pytest.mark.auth keep the real verify_api_key
+    dependency.
+    """
+    if request.node.get_closest_marker("auth"):
+        yield
+        return
+    app.dependency_overrides[verify_api_key] = lambda: "test"
+    yield
+    app.dependency_overrides.pop(verify_api_key, None)
+
+
+@pytest.fixture(autouse=True)
+def db_session():
+    """Wrap each test in a transaction rolled back on teardown.
+
+    Replaces the per-test create_all/drop_all DDL churn: each test sees
+    an empty DB at the cost of a single ROLLBACK. The already-open
+    session is handed to request handlers through a get_db override
+    scoped to this test, so no Session is constructed per request and
+    no override state leaks between tests.
+    """
+    invalidate_active_cache()
+    connection, transaction, session = asyncio.run(_begin_test_transaction())
+
+    async def _get_test_db():
+        yield session
+
+    app.dependency_overrides[get_db] = _get_test_db
+    yield session
+    app.dependency_overrides.pop(get_db, None)
+    asyncio.run(_end_test_transaction(connection, transaction, session))
@@ -1,78 +1,83 @@
 """
 Tests for SOS API endpoints
 """
-import pytest
+import asyncio
 from datetime import datetime, timedelta
 from uuid import uuid4
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-
-from app.main import app
-from app.database import Base, get_db
-from app.models import EmergencyType
-
-# Create in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
 
-def override_get_db():
-    """Override database dependency for testing"""
-    db = TestingSessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-# Override dependencies
-app.dependency_overrides[get_db] = override_get_db
+import orjson
+import pytest
 
-# Test client
-client = TestClient(app)
+from app.models import DeliveryStatus, EmergencyType, SosPacketDB
 
 # Test API key
 TEST_API_KEY = "meshsos-dev-api-key-change-in-production"
 HEADERS = {"X-API-Key": TEST_API_KEY}
 
+# Static packet fields built once; the factory only fills in the
+# per-packet sos_id and timestamp
+_SOS_TEMPLATE = {
+    "device_id": "a" * 64,  # SHA-256 hash is 64 chars
+    "latitude": 37.7749,
+    "longitude": -122.4194,
+    "accuracy": 10.5,
+    "emergency_type": EmergencyType.MEDICAL.value,
+    "optional_message": "Need medical assistance",
+    "battery_percentage": 75,
+    "hop_count": 2,
+    "ttl": 8,
+    "signature": "b" * 64
+}
+
+# Timestamp captured once per test by the autouse fixture below
+_NOW_ISO = datetime.utcnow().isoformat()
+
 
 @pytest.fixture(autouse=True)
-def setup_database():
-    """Create tables before each test"""
-    Base.metadata.create_all(bind=engine)
-    yield
-    Base.metadata.drop_all(bind=engine)
+def freeze_packet_timestamp():
+    """Capture utcnow once per test for every packet the test builds"""
+    global _NOW_ISO
+    _NOW_ISO = datetime.utcnow().isoformat()
 
 
 def create_test_sos_packet():
     """Create a test SOS packet payload"""
-    return {
-        "sos_id": str(uuid4()),
-        "device_id": "a" * 64,  # SHA-256 hash is 64 chars
-        "timestamp": datetime.utcnow().isoformat(),
-        "latitude": 37.7749,
-        "longitude": -122.4194,
-        "accuracy": 10.5,
-        "emergency_type": EmergencyType.MEDICAL.value,
-        "optional_message": "Need medical assistance",
-        "battery_percentage": 75,
-        "hop_count": 2,
-        "ttl": 8,
-        "signature": "b" * 64
+    return {**_SOS_TEMPLATE, "sos_id": str(uuid4()), "timestamp": _NOW_ISO}
+
+
+def create_db_packet(**overrides):
+    """Build a SosPacketDB row for tests that seed the DB directly,
+    skipping the HTTP/validation stack for setup-only data"""
+    fields = {
+        "sos_id": uuid4(),
+        "device_id": _SOS_TEMPLATE["device_id"],
+        "timestamp": datetime.utcnow(),
+        "latitude": _SOS_TEMPLATE["latitude"],
+        "longitude": _SOS_TEMPLATE["longitude"],
+        "emergency_type": EmergencyType.MEDICAL,
+        "battery_percentage": _SOS_TEMPLATE["battery_percentage"],
+        "hop_count": _SOS_TEMPLATE["hop_count"],
+        "ttl": _SOS_TEMPLATE["ttl"],
+        "status": DeliveryStatus.DELIVERED,
     }
+    fields.update(overrides)
+    return SosPacketDB(**fields)
+
+
+@pytest.fixture
+def seeded_packet(db_session):
+    """One SOS row inserted directly for read-path tests, replacing the
+    upload POST each of them used to issue for setup"""
+    row = create_db_packet()
+    db_session.add(row)
+    asyncio.run(db_session.commit())
+    return row
 
 
 class TestHealthEndpoints:
     """Test health check endpoints"""
     
-    def test_root(self):
+    def test_root(self, client):
         """Test root endpoint"""
         response = client.get("/")
         assert response.status_code == 200
@@ -80,7 +85,7 @@ class TestHealthEndpoints:
         assert data["service"] == "MeshSOS Backend"
         assert data["status"] == "healthy"
     
-    def test_health(self):
+    def test_health(self, client):
         """Test health endpoint"""
         response = client.get("/health")
         assert response.status_code == 200
@@ -89,18 +94,21 @@ class TestHealthEndpoints:
 
 class TestAuthentication:
     """Test API key authentication"""
-    
-    def test_missing_api_key(self):
+
+    # Opt out of the suite-wide no_auth override
+    pytestmark = pytest.mark.auth
+
+    def test_missing_api_key(self, client):
         """Test request without API key"""
         response = client.get("/api/v1/active-sos")
         assert response.status_code == 422  # Missing header
     
-    def test_invalid_api_key(self):
+    def test_invalid_api_key(self, client):
         """Test request with invalid API key"""
         response = client.get("/api/v1/active-sos", headers={"X-API-Key": "invalid"})
         assert response.status_code == 401
     
-    def test_valid_api_key(self):
+    def test_valid_api_key(self, client):
         """Test request with valid API key"""
         response = client.get("/api/v1/active-sos", headers=HEADERS)
         assert response.status_code == 200
@@ -109,7 +117,7 @@ class TestAuthentication:
 class TestUploadSOS:
     """Test POST /upload-sos endpoint"""
     
-    def test_upload_new_sos(self):
+    def test_upload_new_sos(self, client):
         """Test uploading a new SOS packet"""
         packet = create_test_sos_packet()
         response = client.post("/api/v1/upload-sos", json=packet, headers=HEADERS)
@@ -119,20 +127,23 @@ class TestUploadSOS:
         assert data["success"] is True
         assert data["sos_id"] == packet["sos_id"]
     
-    def test_upload_duplicate_sos(self):
+    def test_upload_duplicate_sos(self, client):
         """Test uploading duplicate SOS packet (should succeed with message)"""
         packet = create_test_sos_packet()
-        
+        # Same bytes both times, so serialize the payload once
+        body = orjson.dumps(packet)
+        headers = {**HEADERS, "Content-Type": "application/json"}
+
         # First upload
-        response1 = client.post("/api/v1/upload-sos", json=packet, headers=HEADERS)
+        response1 = client.post("/api/v1/upload-sos", content=body, headers=headers)
         assert response1.status_code == 200
-        
+
         # Duplicate upload
-        response2 = client.post("/api/v1/upload-sos", json=packet, headers=HEADERS)
+        response2 = client.post("/api/v1/upload-sos", content=body, headers=headers)
         assert response2.status_code == 200
         assert "already exists" in response2.json()["message"]
     
-    def test_upload_old_timestamp(self):
+    def test_upload_old_timestamp(self, client):
         """Test uploading SOS with old timestamp (replay attack prevention)"""
         packet = create_test_sos_packet()
         packet["timestamp"] = (datetime.utcnow() - timedelta(hours=2)).isoformat()
@@ -141,7 +152,7 @@ class TestUploadSOS:
         assert response.status_code == 400
         assert "too old" in response.json()["detail"]
     
-    def test_upload_invalid_coordinates(self):
+    def test_upload_invalid_coordinates(self, client):
         """Test uploading SOS with invalid coordinates"""
         packet = create_test_sos_packet()
         packet["latitude"] = 200  # Invalid
@@ -150,10 +161,46 @@ class TestUploadSOS:
         assert response.status_code == 422  # Validation error
 
 
+class TestBatchUpload:
+    """Test POST /upload-sos-batch endpoint"""
+
+    def test_batch_upload_new(self, client):
+        """Test uploading a batch of new SOS packets"""
+        packets = [create_test_sos_packet() for _ in range(3)]
+        response = client.post("/api/v1/upload-sos-batch", json=packets, headers=HEADERS)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["inserted"] == [p["sos_id"] for p in packets]
+        assert data["duplicates"] == []
+        assert data["rejected"] == []
+
+    def test_batch_upload_mixed(self, client):
+        """Test batch with duplicate and stale packets"""
+        existing = create_test_sos_packet()
+        client.post("/api/v1/upload-sos", json=existing, headers=HEADERS)
+
+        stale = create_test_sos_packet()
+        stale["timestamp"] = (datetime.utcnow() - timedelta(hours=2)).isoformat()
+        fresh = create_test_sos_packet()
+
+        response = client.post(
+            "/api/v1/upload-sos-batch",
+            json=[existing, stale, fresh],
+            headers=HEADERS
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["inserted"] == [fresh["sos_id"]]
+        assert data["duplicates"] == [existing["sos_id"]]
+        assert data["rejected"] == [stale["sos_id"]]
+
+
 class TestActiveSOS:
     """Test GET /active-sos endpoint"""
     
-    def test_empty_active_sos(self):
+    def test_empty_active_sos(self, client):
         """Test getting active SOS when none exist"""
         response = client.get("/api/v1/active-sos", headers=HEADERS)
         
@@ -162,37 +209,77 @@ class TestActiveSOS:
         assert data["count"] == 0
         assert data["sos_packets"] == []
     
-    def test_get_active_sos(self):
+    def test_get_active_sos(self, client, seeded_packet):
         """Test getting active SOS after upload"""
-        packet = create_test_sos_packet()
-        client.post("/api/v1/upload-sos", json=packet, headers=HEADERS)
-        
         response = client.get("/api/v1/active-sos", headers=HEADERS)
-        
+
         assert response.status_code == 200
         data = response.json()
         assert data["count"] == 1
-        assert data["sos_packets"][0]["sos_id"] == packet["sos_id"]
+        assert data["sos_packets"][0]["sos_id"] == str(seeded_packet.sos_id)
     
-    def test_filter_by_emergency_type(self):
+    @pytest.mark.asyncio
+    async def test_keyset_pagination(self, async_client):
+        """Test paging through active SOS with the compound before cursor"""
+        # Two packets share a timestamp so the sos_id tiebreaker is
+        # exercised across the page boundary
+        packets = []
+        for minutes in (0, 10, 10):
+            packet = create_test_sos_packet()
+            packet["timestamp"] = (
+                datetime.utcnow() - timedelta(minutes=minutes)
+            ).isoformat()
+            packets.append(packet)
+
+        # Independent uploads, dispatched concurrently
+        await asyncio.gather(*[
+            async_client.post("/api/v1/upload-sos", json=p, headers=HEADERS)
+            for p in packets
+        ])
+
+        first = await async_client.get(
+            "/api/v1/active-sos", params={"limit": 2}, headers=HEADERS
+        )
+        assert first.status_code == 200
+        data = first.json()
+        assert data["count"] == 2
+        assert data["next_cursor"] is not None
+        assert data["next_cursor_id"] is not None
+
+        second = await async_client.get(
+            "/api/v1/active-sos",
+            params={
+                "limit": 2,
+                "before": data["next_cursor"],
+                "before_id": data["next_cursor_id"]
+            },
+            headers=HEADERS
+        )
+        assert second.status_code == 200
+        assert second.json()["count"] == 1
+        assert second.json()["next_cursor"] is None
+
+        # No packet skipped or repeated across the two pages
+        seen_ids = {p["sos_id"] for p in data["sos_packets"]}
+        seen_ids.update(p["sos_id"] for p in second.json()["sos_packets"])
+        assert seen_ids == {p["sos_id"] for p in packets}
+
+    def test_filter_by_emergency_type(self, client, db_session):
         """Test filtering active SOS by emergency type"""
-        # Upload medical emergency
-        medical = create_test_sos_packet()
-        medical["emergency_type"] = EmergencyType.MEDICAL.value
-        client.post("/api/v1/upload-sos", json=medical, headers=HEADERS)
-        
-        # Upload fire emergency
-        fire = create_test_sos_packet()
-        fire["emergency_type"] = EmergencyType.FIRE.value
-        client.post("/api/v1/upload-sos", json=fire, headers=HEADERS)
-        
+        # Seed rows directly; only the GET under test goes over HTTP
+        db_session.add_all([
+            create_db_packet(emergency_type=EmergencyType.MEDICAL),
+            create_db_packet(emergency_type=EmergencyType.FIRE),
+        ])
+        asyncio.run(db_session.commit())
+
         # Filter by medical
         response = client.get(
             "/api/v1/active-sos",
             params={"emergency_type": "medical"},
             headers=HEADERS
         )
-        
+
         assert response.status_code == 200
         data = response.json()
         assert data["count"] == 1
@@ -202,15 +289,12 @@ class TestActiveSOS:
 class TestMarkResponded:
     """Test POST /mark-responded endpoint"""
     
-    def test_mark_responded(self):
+    def test_mark_responded(self, client, seeded_packet):
         """Test marking SOS as responded"""
-        packet = create_test_sos_packet()
-        client.post("/api/v1/upload-sos", json=packet, headers=HEADERS)
-        
         response = client.post(
             "/api/v1/mark-responded",
             json={
-                "sos_id": packet["sos_id"],
+                "sos_id": str(seeded_packet.sos_id),
                 "responder_id": "responder123"
             },
             headers=HEADERS
@@ -223,7 +307,7 @@ class TestMarkResponded:
         active = client.get("/api/v1/active-sos", headers=HEADERS)
         assert active.json()["count"] == 0
     
-    def test_mark_nonexistent_responded(self):
+    def test_mark_nonexistent_responded(self, client):
         """Test marking nonexistent SOS as responded"""
         response = client.post(
             "/api/v1/mark-responded",
@@ -240,19 +324,16 @@ class TestMarkResponded:
 class TestGetSOSById:
     """Test GET /sos/{sos_id} endpoint"""
     
-    def test_get_existing_sos(self):
+    def test_get_existing_sos(self, client, seeded_packet):
         """Test getting existing SOS by ID"""
-        packet = create_test_sos_packet()
-        client.post("/api/v1/upload-sos", json=packet, headers=HEADERS)
-        
-        response = client.get(f"/api/v1/sos/{packet['sos_id']}", headers=HEADERS)
-        
+        response = client.get(f"/api/v1/sos/{seeded_packet.sos_id}", headers=HEADERS)
+
         assert response.status_code == 200
         data = response.json()
-        assert data["sos_id"] == packet["sos_id"]
-        assert data["latitude"] == packet["latitude"]
+        assert data["sos_id"] == str(seeded_packet.sos_id)
+        assert data["latitude"] == seeded_packet.latitude
     
-    def test_get_nonexistent_sos(self):
+    def test_get_nonexistent_sos(self, client):
         """Test getting nonexistent SOS by ID"""
         response = client.get(f"/api/v1/sos/{uuid4()}", headers=HEADERS)
         assert response.status_code == 404
@@ -15,7 +15,7 @@ const TYPE_COLORS = {
 
 // Create custom SVG icon for each emergency type
 const createCustomIcon = (type) => {
-    const color = TYPE_COLORS[type] || TYPE_COLORS.GENERAL;
+    const color = TYPE_COLORS[(type || '').toUpperCase()] || TYPE_COLORS.GENERAL;
 
     return L.divIcon({
         className: 'custom-marker-icon', // defined in CSS to remove default square box
@@ -71,9 +71,9 @@ export default function Map({ activeSOS = [] }) {
                     >
                         <Popup className="sos-popup">
                             <div className="popup-content">
-                                <div className="popup-header" style={{ borderTop: `3px solid ${TYPE_COLORS[sos.emergency_type] || TYPE_COLORS.GENERAL}` }}>
+                                <div className="popup-header" style={{ borderTop: `3px solid ${TYPE_COLORS[sos.emergency_type.toUpperCase()] || TYPE_COLORS.GENERAL}` }}>
                                     <span className={`popup-badge type-${sos.emergency_type.toLowerCase()}`}>
-                                        {sos.emergency_type}
+                                        {sos.emergency_type.toUpperCase()}
                                     </span>
                                     <span className="popup-time">
                                         {new Date(sos.timestamp).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' })}
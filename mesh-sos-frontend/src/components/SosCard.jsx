@@ -21,7 +21,7 @@ const statusColors = {
 
 export default function SosCard({ sos, onUpdate }) {
     const [loading, setLoading] = useState(false);
-    const emergencyColor = emergencyColors[sos.emergency_type] || emergencyColors.GENERAL;
+    const emergencyColor = emergencyColors[(sos.emergency_type || '').toUpperCase()] || emergencyColors.GENERAL;
     const statusColor = statusColors[sos.status] || 'var(--text-secondary)';
 
     const formatDate = (timestamp) => {
@@ -49,7 +49,7 @@ export default function SosCard({ sos, onUpdate }) {
             <div className="sos-card-header">
                 <div className="emergency-badge" style={{ backgroundColor: `${emergencyColor}20`, color: emergencyColor }}>
                     <Activity size={20} />
-                    <span>{sos.emergency_type}</span>
+                    <span>{(sos.emergency_type || '').toUpperCase()}</span>
                 </div>
                 <div className="status-badge" style={{ color: statusColor }}>
                     {sos.status}
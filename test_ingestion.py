@@ -1,34 +1,44 @@
 
-import urllib.request
-import urllib.parse
 import json
+import sys
 import uuid
 from datetime import datetime
+from pathlib import Path
 
-url = "http://127.0.0.1:8001/api/v1/upload-sos"
-
-payload = {
-    "sos_id": str(uuid.uuid4()),
-    "device_id": "debug-script-device",
-    "timestamp": datetime.utcnow().isoformat(),
-    "latitude": 28.7041,
-    "longitude": 77.1025,
-    "emergency_type": "MEDICAL",
-    "optional_message": "Debug test packet via urllib",
-    "hop_count": 0,
-    "ttl": 10,
-    "battery_percentage": 95
-}
-
-print(f"Sending payload: {json.dumps(payload, indent=2)}")
-
-try:
-    data = json.dumps(payload).encode('utf-8')
-    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
-    with urllib.request.urlopen(req) as response:
-        print(f"Status Code: {response.getcode()}")
-        print(f"Response: {response.read().decode('utf-8')}")
-except urllib.error.HTTPError as e:
-    print(f"HTTPError: {e.code} - {e.read().decode('utf-8')}")
-except Exception as e:
-    print(f"Error: {e}")
+sys.path.insert(0, str(Path(__file__).parent / "mesh-sos-backend"))
+
+from fastapi.testclient import TestClient
+
+from app.config import get_settings
+from app.main import app
+
+
+def main():
+    payload = {
+        "sos_id": str(uuid.uuid4()),
+        "device_id": "debug-script-device",
+        "timestamp": datetime.utcnow().isoformat(),
+        "latitude": 28.7041,
+        "longitude": 77.1025,
+        "emergency_type": "MEDICAL",
+        "optional_message": "Debug test packet via TestClient",
+        "hop_count": 0,
+        "ttl": 10,
+        "battery_percentage": 95
+    }
+
+    print(f"Sending payload: {json.dumps(payload, indent=2)}")
+
+    # In-process ASGI call: no running uvicorn or socket round-trip needed
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/v1/upload-sos",
+            json=payload,
+            headers={"X-API-Key": get_settings().api_key}
+        )
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {response.text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,29 @@
 
-import urllib.request
 import json
+import sys
+from pathlib import Path
 
-url = "http://127.0.0.1:8001/api/v1/active-sos?hours=24&limit=10"
+sys.path.insert(0, str(Path(__file__).parent / "mesh-sos-backend"))
 
-print(f"Fetching from: {url}")
+from fastapi.testclient import TestClient
 
-try:
-    with urllib.request.urlopen(url) as response:
-        print(f"Status Code: {response.getcode()}")
-        data = json.loads(response.read().decode('utf-8'))
-        print(f"Response: {json.dumps(data, indent=2)}")
-except Exception as e:
-    print(f"Error: {e}")
+from app.config import get_settings
+from app.main import app
+
+
+def main():
+    print("Fetching /api/v1/active-sos?hours=24&limit=10")
+
+    # In-process ASGI call: no running uvicorn or socket round-trip needed
+    with TestClient(app) as client:
+        response = client.get(
+            "/api/v1/active-sos",
+            params={"hours": 24, "limit": 10},
+            headers={"X-API-Key": get_settings().api_key}
+        )
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {json.dumps(response.json(), indent=2)}")
+
+
+if __name__ == "__main__":
+    main()